@@ -1,10 +1,13 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
 import random
-from fuzzywuzzy import fuzz
+import numpy as np
+from rapidfuzz import fuzz, process
 import re
 import datetime
+import threading
 import os
 import base64
 
@@ -18,21 +21,30 @@ EXCEL_FILE_PATH = "YT_weather_matched.xlsx"
 MOVIE_POSTER_LOCAL_DIR = "movie"
 WEATHER_CODES_FILE_PATH = "weather_codes.csv"
 WEATHER_IMAGES_DIR = "images"
+# 背景圖片放在 static/ 資料夾，由 Streamlit 靜態檔案服務提供 (見 .streamlit/config.toml)
+BACKGROUND_IMAGE_URL = "./app/static/background.jpg"
 
 # 新增：天氣圖片支持的擴展名列表
 IMAGE_EXTENSIONS = ['png', 'gif', 'jpg', 'jpeg']
 
+# 預先建立 <img> 標籤模板；天氣圖示固定寬度，直接使用特化的模板
+WEATHER_ICON_WIDTH = 70
+_IMG_TAG_TEMPLATE = '<img src="data:{mime_type};base64,{data_url}" alt="圖片" style="{style}">'
+_WEATHER_IMG_TAG_TEMPLATE = _IMG_TAG_TEMPLATE.replace("{style}", f"width: {WEATHER_ICON_WIDTH}px;")
+
+# 預先編譯 YouTube 影片 ID 的正規表示式
+_YT_ID_RE = re.compile(r'(?:v=|youtu\.be/|embed/|live/)([a-zA-Z0-9_-]{11})')
+_YT_UC_RE = re.compile(r'googleusercontent\.com/youtube\.com/\d+([a-zA-Z0-9_-]+)')
 
-# --- 輔助函數 ---
 
-def set_background(image_file):
-    with open(image_file, "rb") as image:
-        encoded = base64.b64encode(image.read()).decode()
+# --- 輔助函數 ---
 
+def set_background(image_url):
+    """以 Streamlit 靜態檔案網址設定背景圖片，瀏覽器可快取，不必每次重新執行都內嵌 Base64。"""
     st.markdown(f"""
         <style>
         .stApp {{
-            background-image: url("data:image/jpg;base64,{encoded}");
+            background-image: url("{image_url}");
             background-size: cover;
             background-repeat: no-repeat;
             background-attachment: fixed;
@@ -42,12 +54,12 @@ def set_background(image_file):
 
 def extract_youtube_id(url):
     """從YouTube URL中提取影片ID。"""
-    match = re.search(r'(?:v=|youtu\.be/|embed/|live/)([a-zA-Z0-9_-]{11})', url)
+    match = _YT_ID_RE.search(url)
     if match:
         return match.group(1)
 
     # 處理 googleusercontent.com 的特殊情況
-    match_usercontent = re.search(r'googleusercontent\.com/youtube\.com/\d+([a-zA-Z0-9_-]+)', url)
+    match_usercontent = _YT_UC_RE.search(url)
     if match_usercontent:
         return match_usercontent.group(1)
 
@@ -64,10 +76,12 @@ def extract_youtube_id(url):
     return None
 
 # 新增輔助函數：將本地圖片轉換為 Base64 編碼的 HTML <img> 標籤
+@st.cache_data(max_entries=64)
 def load_local_image_as_base64(image_path, width=None, height=None):
     """
     載入本地圖片並轉換為 Base64 編碼的 HTML <img> 標籤。
     用於確保 GIF 動畫在 Streamlit Cloud 上正常播放。
+    結果依路徑與尺寸快取，快取鍵只有短字串，不需雜湊圖片內容。
     """
     if not image_path or not os.path.exists(image_path):
         return None
@@ -82,139 +96,180 @@ def load_local_image_as_base64(image_path, width=None, height=None):
             contents = f.read()
         data_url = base64.b64encode(contents).decode("utf-8")
 
+        # 確保正確的 MIME 類型
+        mime_type = f"image/{'jpeg' if file_extension == 'jpg' else file_extension}"
+
+        if width == WEATHER_ICON_WIDTH and not height:
+            return _WEATHER_IMG_TAG_TEMPLATE.format(mime_type=mime_type, data_url=data_url)
+
         style_attrs = []
         if width:
             style_attrs.append(f"width: {width}px;")
         if height:
             style_attrs.append(f"height: {height}px;")
 
-        style_str = " ".join(style_attrs) if style_attrs else ""
-
-        # 確保正確的 MIME 類型
-        mime_type = f"image/{'jpeg' if file_extension == 'jpg' else file_extension}"
-
-        return f'<img src="data:{mime_type};base64,{data_url}" alt="圖片" style="{style_str}">'
+        return _IMG_TAG_TEMPLATE.format(mime_type=mime_type, data_url=data_url, style=" ".join(style_attrs))
     except Exception as e:
         st.warning(f"無法載入圖片 {image_path} 為 Base64：{e}")
         return None
 
+@st.cache_resource
+def _weather_image_index(base_dir):
+    """掃描一次天氣圖片資料夾，建立 {代碼: 圖片路徑} 的對應表，依 IMAGE_EXTENSIONS 的順序決定優先權。"""
+    if not os.path.isdir(base_dir):
+        return {}
+
+    files_by_ext = {}
+    for filename in os.listdir(base_dir):
+        if '.' in filename:
+            stem, ext = filename.rsplit('.', 1)
+            files_by_ext.setdefault(ext, []).append(stem)
+
+    index = {}
+    for ext in IMAGE_EXTENSIONS:
+        for stem in files_by_ext.get(ext, []):
+            index.setdefault(stem, os.path.join(base_dir, f"{stem}.{ext}"))
+    return index
+
 # 修改：簡化圖片路徑獲取邏輯，因為總是能匹配或有預設圖
 def get_image_path_or_default(base_dir, code):
     """
     嘗試找到特定代碼的圖片。如果沒有，則找預設圖片。
     假設 code 總是有效，且圖片存在或預設圖存在。
     """
-    for ext in IMAGE_EXTENSIONS:
-        specific_path = os.path.join(base_dir, f"{code}.{ext}")
-        if os.path.exists(specific_path):
-            return specific_path
+    index = _weather_image_index(base_dir)
+    # 如果特定代碼圖片不存在，則返回預設圖片的路徑；如果連預設圖片都找不到，則返回 None
+    return index.get(str(code)) or index.get("default")
 
-    # 如果特定代碼圖片不存在，則返回預設圖片的路徑
-    for ext in IMAGE_EXTENSIONS:
-        default_path = os.path.join(base_dir, f"default.{ext}")
-        if os.path.exists(default_path):
-            return default_path
-    return None # 如果連預設圖片都找不到，則返回 None
+@st.cache_resource
+def _http_session():
+    """
+    建立整個程序共用的 HTTP 連線池。Streamlit 每次重新執行都會重跑整個腳本，
+    因此以 cache_resource 保存，重複呼叫中央氣象署 API 時不必重新建立 TCP/TLS 連線。
+    """
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+    return session
 
-@st.cache_data(ttl=3600)
+@st.cache_resource
+def _http_validator_cache():
+    """
+    整個程序共用的 {URL: ETag / Last-Modified 與上次回應內容} 對應表，內容未變時免去重新下載。
+    各個使用者工作階段在不同執行緒中執行，存取時需持有一併返回的鎖。
+    """
+    return {}, threading.Lock()
+
+def _get_json(url, timeout=10):
+    """
+    透過共用連線池發送 GET 請求並返回 JSON。
+    若伺服器提供 ETag 或 Last-Modified，下次請求會帶上條件標頭；收到 304 時直接沿用上次的內容。
+    """
+    validator_cache, lock = _http_validator_cache()
+    with lock:
+        cached = validator_cache.get(url)
+
+    res = _http_session().get(url, timeout=timeout, headers=cached['headers'] if cached else None)
+    if res.status_code == 304 and cached:
+        return cached['data']
+    res.raise_for_status()
+    data = res.json()
+
+    validators = {}
+    if res.headers.get('ETag'):
+        validators['If-None-Match'] = res.headers['ETag']
+    if res.headers.get('Last-Modified'):
+        validators['If-Modified-Since'] = res.headers['Last-Modified']
+    if validators:
+        with lock:
+            validator_cache[url] = {'headers': validators, 'data': data}
+    return data
+
+@st.cache_data(ttl=3600, max_entries=1)
 def get_location_names():
     """從中央氣象署 API 獲取台灣縣市列表。"""
     url = f'https://opendata.cwa.gov.tw/api/v1/rest/datastore/F-C0032-001?Authorization={API_KEY}'
     try:
-        res = requests.get(url, timeout=10)
-        res.raise_for_status()
-        data = res.json()
+        data = _get_json(url)
         if 'records' in data and 'location' in data['records']:
             return [loc['locationName'] for loc in data['records']['location']]
     except requests.exceptions.RequestException as e:
         st.error(f"錯誤：無法獲取縣市列表，請檢查網路或 API 金鑰：{e}")
     return ["臺北市", "新北市", "桃園市", "臺中市", "臺南市", "高雄市", "基隆市", "新竹市", "嘉義市", "新竹縣", "苗栗縣", "彰化縣", "南投縣", "雲林縣", "嘉義縣", "屏東縣", "宜蘭縣", "花蓮縣", "臺東縣", "澎湖縣", "金門縣", "連江縣"]
 
-@st.cache_data(ttl=3600)
-def get_weather_data(city_name):
-    """根據城市名稱獲取天氣資訊，包含天氣描述、降雨機率、最低溫度和最高溫度。"""
+def _parse_api_time(value):
+    """解析 API 的時間字串 (格式為 '%Y-%m-%d %H:%M:%S')，格式錯誤時返回 None。"""
+    try:
+        # fromisoformat 為 C 實作，比 strptime 快得多
+        return datetime.datetime.fromisoformat(value.replace(' ', 'T'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def _attach_parsed_times(location_data):
+    """為每個天氣元素的時段預先解析 startTime / endTime，每個時間字串只解析一次。"""
+    for elem in location_data['weatherElement']:
+        for time_item in elem.get('time', []):
+            time_item['_start'] = _parse_api_time(time_item.get('startTime'))
+            time_item['_end'] = _parse_api_time(time_item.get('endTime'))
+
+def _pick_value(element, start_dt):
+    """取得天氣元素中包含 start_dt 的時段數值；若無精確匹配則取第一個時段，無資料時返回 "N/A"。"""
+    if not element or not element.get('time'):
+        return "N/A"
+
+    for time_item in element['time']:
+        item_start_dt = time_item['_start']
+        item_end_dt = time_item['_end']
+        # 檢查預報時段是否包含在該元素的時段內
+        if item_start_dt and item_end_dt and item_start_dt <= start_dt < item_end_dt:
+            return time_item['parameter']['parameterName']
+
+    return element['time'][0]['parameter']['parameterName']
+
+@st.cache_data(ttl=1800)
+def _fetch_raw(city_name):
+    """向中央氣象署 API 取得指定城市的原始預報 JSON。"""
     # API_KEY 不再在函數內部硬編碼或重複定義
     url = f'https://opendata.cwa.gov.tw/api/v1/rest/datastore/F-C0032-001?Authorization={API_KEY}&locationName={city_name}'
+    return _get_json(url)
+
+@st.cache_data(ttl=1800, max_entries=64)
+def _extract_forecast(city_name, raw, now_bucket):
+    """
+    從原始預報 JSON 中挑出最接近 now_bucket 的時段並組裝天氣資訊。
+    now_bucket 為取整到 15 分鐘的時間，同一時段內的重複查詢可直接命中快取。
+    """
     try:
-        res = requests.get(url, timeout=10)
-        res.raise_for_status()
-        data = res.json()
+        if 'records' in raw and 'location' in raw['records'] and raw['records']['location']:
+            location_data = raw['records']['location'][0]
+            _attach_parsed_times(location_data)
 
-        if 'records' in data and 'location' in data['records'] and data['records']['location']:
-            location_data = data['records']['location'][0]
+            # 依名稱建立天氣元素索引，避免每個元素都重新掃描一次列表
+            elements = {elem['elementName']: elem for elem in location_data['weatherElement']}
 
             # 獲取天氣現象 (Wx)
-            wx_element = next((elem for elem in location_data['weatherElement'] if elem['elementName'] == 'Wx'), None)
+            wx_element = elements.get('Wx')
             if not wx_element:
                 return {"status": "error", "display_text": f"無法取得 {city_name} 天氣資料：缺少 Wx 元素。"}
 
-            time_elements = wx_element['time']
-            valid_time_elements = []
-            for item in time_elements:
-                try:
-                    # 嘗試解析 startTime，並確保其格式正確
-                    datetime.datetime.strptime(item['startTime'], '%Y-%m-%d %H:%M:%S')
-                    valid_time_elements.append(item)
-                except ValueError:
-                    pass
+            # 只保留 startTime 格式正確的時段
+            valid_time_elements = [item for item in wx_element['time'] if item['_start']]
 
             if not valid_time_elements:
                 return {"status": "error", "display_text": f"無法取得 {city_name} 天氣資料：預報時間數據無效。"}
 
             # 找到最接近當前時間的預報時段
-            now = datetime.datetime.now()
-            forecast = min(valid_time_elements,
-                           key=lambda x: abs(datetime.datetime.strptime(x['startTime'], '%Y-%m-%d %H:%M:%S') - now))
+            forecast = min(valid_time_elements, key=lambda x: abs(x['_start'] - now_bucket))
             desc = forecast['parameter']['parameterName']
-            start_dt = datetime.datetime.strptime(forecast['startTime'], '%Y-%m-%d %H:%M:%S')
+            start_dt = forecast['_start']
             hour = start_dt.hour
             time_desc = "午夜到早晨" if 0 <= hour < 6 else "早晨到中午" if 6 <= hour < 12 else "中午到傍晚" if 12 <= hour < 18 else "傍晚到午夜"
 
-            # 獲取降雨機率 (PoP)
-            pop = "N/A"
-            pop_element = next((elem for elem in location_data['weatherElement'] if elem['elementName'] == 'PoP'), None)
-
-            if pop_element:
-                pop_data_found = False
-                for pop_time in pop_element['time']:
-                    pop_start_dt = datetime.datetime.strptime(pop_time['startTime'], '%Y-%m-%d %H:%M:%S')
-                    pop_end_dt = datetime.datetime.strptime(pop_time['endTime'], '%Y-%m-%d %H:%M:%S')
-
-                    # 檢查預報時段是否包含在降雨機率時段內
-                    if pop_start_dt <= start_dt < pop_end_dt:
-                        pop = pop_time['parameter']['parameterName'] + "%"
-                        pop_data_found = True
-                        break
-
-                if not pop_data_found and pop_element.get('time'):
-                    # 如果沒有精確匹配，就取第一個時段的降雨機率
-                    pop = pop_element['time'][0]['parameter']['parameterName'] + "%"
-
-            # 獲取最低溫度 (MinT)
-            min_temp = "N/A"
-            min_temp_element = next((elem for elem in location_data['weatherElement'] if elem['elementName'] == 'MinT'), None)
-            if min_temp_element:
-                for temp_time in min_temp_element['time']:
-                    temp_start_dt = datetime.datetime.strptime(temp_time['startTime'], '%Y-%m-%d %H:%M:%S')
-                    temp_end_dt = datetime.datetime.strptime(temp_time['endTime'], '%Y-%m-%d %H:%M:%S')
-                    if temp_start_dt <= start_dt < temp_end_dt:
-                        min_temp = temp_time['parameter']['parameterName']
-                        break
-                if min_temp == "N/A" and min_temp_element.get('time'):
-                    min_temp = min_temp_element['time'][0]['parameter']['parameterName']
-
-            # 獲取最高溫度 (MaxT)
-            max_temp = "N/A"
-            max_temp_element = next((elem for elem in location_data['weatherElement'] if elem['elementName'] == 'MaxT'), None)
-            if max_temp_element:
-                for temp_time in max_temp_element['time']:
-                    temp_start_dt = datetime.datetime.strptime(temp_time['startTime'], '%Y-%m-%d %H:%M:%S')
-                    temp_end_dt = datetime.datetime.strptime(temp_time['endTime'], '%Y-%m-%d %H:%M:%S')
-                    if temp_start_dt <= start_dt < temp_end_dt:
-                        max_temp = temp_time['parameter']['parameterName']
-                        break
-                if max_temp == "N/A" and max_temp_element.get('time'):
-                    max_temp = max_temp_element['time'][0]['parameter']['parameterName']
+            # 獲取降雨機率 (PoP)、最低溫度 (MinT) 與最高溫度 (MaxT)
+            pop = _pick_value(elements.get('PoP'), start_dt)
+            if pop != "N/A":
+                pop += "%"
+            min_temp = _pick_value(elements.get('MinT'), start_dt)
+            max_temp = _pick_value(elements.get('MaxT'), start_dt)
 
             # 組裝顯示文字，包含溫度
             display_text = (
@@ -233,25 +288,74 @@ def get_weather_data(city_name):
 
         return {"status": "error", "display_text": f"無法取得 {city_name} 天氣資料：資料結構異常或該縣市無預報資料。"}
 
+    except Exception as e:
+        return {"status": "error", "display_text": f"處理 {city_name} 天氣資料時發生錯誤: {e}"}
+
+def get_weather_data(city_name):
+    """根據城市名稱獲取天氣資訊，包含天氣描述、降雨機率、最低溫度和最高溫度。"""
+    try:
+        raw = _fetch_raw(city_name)
     except requests.exceptions.RequestException as e:
         return {"status": "error", "display_text": f"無法取得 {city_name} 天氣資料：網路或 API 錯誤 ({e})。請檢查您的 API 金鑰是否有效。"}
     except Exception as e:
         return {"status": "error", "display_text": f"處理 {city_name} 天氣資料時發生錯誤: {e}"}
 
+    now = datetime.datetime.now()
+    now_bucket = now.replace(minute=(now.minute // 15) * 15, second=0, microsecond=0)
+    return _extract_forecast(city_name, raw, now_bucket)
+
+
+def _read_video_catalog(excel_path):
+    """
+    讀取影片目錄。Excel 仍是資料來源，但會另存一份 Parquet 副本；
+    若副本不比 Excel 舊，則直接讀取解析速度快得多的 Parquet。
+    """
+    parquet_path = os.path.splitext(excel_path)[0] + ".parquet"
+    try:
+        if os.path.getmtime(parquet_path) >= os.path.getmtime(excel_path):
+            return pd.read_parquet(parquet_path)
+    except (OSError, ImportError, ValueError):
+        pass # 副本不存在、過期或無法讀取時，改讀 Excel
+
+    df = pd.read_excel(excel_path)
+    try:
+        df.to_parquet(parquet_path)
+    except Exception:
+        pass # 無法寫入副本 (例如唯讀檔案系統) 不影響正常讀取
+    return df
+
+# 本地靜態檔案以 cache_resource 快取，所有使用者共用同一物件，免去每次存取的序列化成本。
+# 讀取失敗時直接拋出例外，不快取失敗結果；錯誤訊息由呼叫端顯示，下次執行會重新嘗試。
+@st.cache_resource
+def _load_video_catalog(excel_path):
+    """從指定的本地 Excel 檔案路徑讀取影片資料，讀取失敗時拋出例外。"""
+    df = _read_video_catalog(excel_path)
+    empty_column = pd.Series('', index=df.index)
+
+    # 以欄為單位一次處理，避免 iterrows 逐列建立 Series
+    raw_urls = df.get('影片URL', empty_column)
+    urls = raw_urls.astype(str).str.strip()
+    descs = df.get('matched_weather_descriptions', empty_column).astype(str).str.strip()
+    if '歌曲名稱' in df:
+        titles = df['歌曲名稱'].astype(str).str.strip()
+    else:
+        titles = descs.str.split(',').str[0].where(descs.ne(''), '未知歌曲').str.strip()
+
+    mask = urls.ne('') & descs.ne('') & raw_urls.notna()
+    # 預先正規化描述文字，推薦時只需比對，不必每次重新轉小寫
+    descs_lower = descs[mask].str.lower()
+    return [
+        {'index': index, 'url': url, 'desc': desc, 'title': title,
+         'desc_lower': desc_lower,
+         'youtube_id': extract_youtube_id(url)} # 目錄內容不變，預先提取影片 ID
+        for index, url, desc, title, desc_lower
+        in zip(df.index[mask], urls[mask], descs[mask], titles[mask], descs_lower)
+    ]
 
-@st.cache_data(ttl=3600)
 def initialize_videos(excel_path):
     """從指定的本地 Excel 檔案路徑讀取影片資料。"""
     try:
-        df = pd.read_excel(excel_path)
-        videos = []
-        for index, row in df.iterrows():
-            url = str(row.get('影片URL', '')).strip()
-            desc = str(row.get('matched_weather_descriptions', '')).strip()
-            song_title = str(row.get('歌曲名稱', desc.split(',')[0] if desc else '未知歌曲')).strip()
-            if url and desc and not pd.isna(url):
-                videos.append({'index': index, 'url': url, 'desc': desc, 'title': song_title})
-        return videos
+        return _load_video_catalog(excel_path)
     except FileNotFoundError:
         st.error(f"錯誤：找不到 Excel 檔案 '{excel_path}'。請確保檔案存在且路徑正確。")
         return []
@@ -286,45 +390,96 @@ def get_movie_poster_urls():
         st.error(f"從本地電影海報資料夾讀取時發生錯誤: {e}")
         return []
 
-@st.cache_data(ttl=3600)
+@st.cache_resource
+def _load_weather_code_tables(csv_path):
+    """
+    從 CSV 檔案載入天氣描述與分類代碼的對應表，讀取失敗時拋出例外。
+    同時預先建立小寫描述與代碼列表，供查詢時的模糊匹配直接使用。
+    """
+    mapping = pd.read_csv(csv_path).set_index('中文描述')['分類代碼'].to_dict()
+    return {'exact': mapping, 'keys_lower': [k.lower() for k in mapping], 'codes': list(mapping.values())}
+
 def load_weather_codes(csv_path):
-    """從 CSV 檔案載入天氣描述與分類代碼的對應表。"""
+    """從 CSV 檔案載入天氣描述與分類代碼的對應表，失敗時返回空的對應表。"""
     try:
         if not os.path.exists(csv_path):
             st.error(f"錯誤：找不到天氣代碼檔案 '{csv_path}'。請確保檔案存在且路徑正確。")
-            return {}
-        df = pd.read_csv(csv_path)
-        return df.set_index('中文描述')['分類代碼'].to_dict()
+        else:
+            return _load_weather_code_tables(csv_path)
     except Exception as e:
         st.error(f"從天氣代碼檔案讀取時發生錯誤: {e}")
-        return {}
+    return {'exact': {}, 'keys_lower': [], 'codes': []}
 
 
 # 集中化 Session State 重置邏輯
-def reset_recommendation_states():
-    """重置所有推薦相關的 Streamlit Session State 變數。"""
-    st.session_state.result_text = ""
-    st.session_state.recommended_youtube_id = None
-    st.session_state.recommended_image_url = None
-    # 注意：這裡不重置音樂和電影的已推薦索引，它們有自己的內部重置邏輯
-    st.session_state.recommended_weather_image_html = None # 現在存儲 HTML
-    st.session_state.weather_image_caption_desc = None
+def reset_recommendation_states(**new_values):
+    """
+    重置所有推薦相關的 Streamlit Session State 變數。
+    可透過關鍵字參數直接指定部分變數的新值，與重置合併為一次 update。
+    """
+    st.session_state.update({
+        "result_text": "",
+        "recommended_youtube_id": None,
+        "recommended_image_url": None,
+        # 注意：這裡不重置音樂和電影的已推薦索引，它們有自己的內部重置邏輯
+        "recommended_weather_image_html": None, # 現在存儲 HTML
+        "weather_image_caption_desc": None,
+        **new_values,
+    })
+
+def _new_pool(all_indices):
+    """
+    建立索引池：items 為尚未推薦的索引列表，positions 記錄每個索引在 items 中的位置。
+    挑選與移除皆為 O(1)，點選時不必重新建立整份列表。
+    """
+    items = list(all_indices)
+    return {'items': items, 'positions': {index: position for position, index in enumerate(items)}}
+
+def _get_recommendation_pool(state_key, all_indices):
+    """取得 Session State 中尚未推薦項目的索引池，不存在時以 all_indices 建立。"""
+    if state_key not in st.session_state:
+        st.session_state[state_key] = _new_pool(all_indices)
+    return st.session_state[state_key]
+
+def _reset_pool(pool, all_indices):
+    """所有項目都推薦過後，將索引池重置為完整列表。"""
+    pool.update(_new_pool(all_indices))
+
+def _discard_from_pool(pool, index):
+    """將已推薦的索引移出索引池：以最後一個索引填補其位置後移除最後一格。"""
+    position = pool['positions'].pop(index, None)
+    if position is None:
+        return
+    last_index = pool['items'].pop()
+    if position < len(pool['items']):
+        pool['items'][position] = last_index
+        pool['positions'][last_index] = position
+
+def _choose_from_pool(pool):
+    """從索引池隨機選一個索引。"""
+    return pool['items'][random.randrange(len(pool['items']))]
+
+@st.cache_resource
+def _video_index(excel_path):
+    """
+    建立所有音樂的原始索引集合與 {原始索引: 影片} 對應表。
+    與 _load_video_catalog 使用相同的快取鍵，目錄重新載入時會一併重建，整個程序只保存一份。
+    """
+    all_videos = _load_video_catalog(excel_path)
+    return frozenset(video['index'] for video in all_videos), {video['index']: video for video in all_videos}
 
 def get_available_music_indices(all_videos):
     """獲取尚未推薦的音樂的**原始索引**，並處理重置邏輯。"""
-    if 'recommended_music_original_indices' not in st.session_state:
-        st.session_state.recommended_music_original_indices = set()
-
-    all_original_indices = {video['index'] for video in all_videos}
+    all_original_indices, _ = _video_index(EXCEL_FILE_PATH)
 
-    available_original_indices = list(all_original_indices - st.session_state.recommended_music_original_indices)
+    pool = _get_recommendation_pool('music_pool', all_original_indices)
 
-    if not available_original_indices and len(all_original_indices) > 0:
-        st.session_state.recommended_music_original_indices = set()
-        available_original_indices = list(all_original_indices)
+    if not pool['items'] and len(all_original_indices) > 0:
+        _reset_pool(pool, all_original_indices)
         st.info("所有音樂都推薦過了，已重置音樂推薦列表。")
 
-    return available_original_indices
+    # 返回 {索引: 位置} 對應表，呼叫端以 O(1) 的成員檢查篩選影片
+    return pool['positions']
 
 def find_and_recommend_music(weather_desc, all_videos):
     """
@@ -334,33 +489,27 @@ def find_and_recommend_music(weather_desc, all_videos):
     if not all_videos:
         return "音樂列表為空，無法推薦音樂。", None
 
-    available_original_indices = get_available_music_indices(all_videos)
+    available_original_indices = get_available_music_indices(all_videos) # 這裡會處理重置邏輯和提示
     available_videos = [video for video in all_videos if video['index'] in available_original_indices]
 
     if not available_videos:
-        # 如果所有可用音樂都推薦過了，再次獲取已重置的列表
-        available_original_indices = get_available_music_indices(all_videos) # 這會觸發重置提示
-        available_videos = [video for video in all_videos if video['index'] in available_original_indices]
-        if not available_videos: # 再次檢查，以防數據為空
-            return "沒有可用的音樂可以隨機推薦了。", None
-
-    matched_available_videos_with_score = []
-    best_score_overall = -1
-    for video in available_videos:
-        score = fuzz.partial_ratio(weather_desc.lower(), video['desc'].lower())
-        if score >= 30: # 保留您的最小匹配度
-            matched_available_videos_with_score.append((video, score))
-            if score > best_score_overall:
-                best_score_overall = score
+        return "沒有可用的音樂可以隨機推薦了。", None
+
+    # 一次呼叫 cdist 批次計算所有可用音樂的匹配分數，避免逐首在 Python 中比對
+    # score_cutoff 讓 RapidFuzz 在 C++ 端提早放棄低於最小匹配度的描述 (其分數記為 0)
+    choices = [video['desc_lower'] for video in available_videos]
+    scores = process.cdist([weather_desc.lower()], choices, scorer=fuzz.partial_ratio,
+                           score_cutoff=30, workers=-1)[0]
 
     selected_video = None
-    if matched_available_videos_with_score:
-        top_score_matches = [video_item for video_item, score_val in matched_available_videos_with_score if score_val == best_score_overall]
-        selected_video = random.choice(top_score_matches)
+    best_score_overall = scores.max()
+    if best_score_overall >= 30: # 保留您的最小匹配度
+        top_score_matches = np.argwhere(scores == best_score_overall).ravel()
+        selected_video = available_videos[random.choice(top_score_matches)]
 
     if selected_video:
-        youtube_id = extract_youtube_id(selected_video['url'])
-        st.session_state.recommended_music_original_indices.add(selected_video['index'])
+        youtube_id = selected_video['youtube_id']
+        _discard_from_pool(st.session_state.music_pool, selected_video['index'])
         display_text = "這樣的天氣來聽這首療癒一下吧！"
 
         if youtube_id:
@@ -377,15 +526,16 @@ def random_music_recommendation(all_videos, skip_info_reset=False):
         return "音樂列表為空，無法隨機推薦音樂。", None
 
     available_original_indices = get_available_music_indices(all_videos) # 這裡會處理重置邏輯和提示
-    available_videos_for_random = [video for video in all_videos if video['index'] in available_original_indices]
 
-    if not available_videos_for_random:
-        # get_available_music_indices 已經處理了 info 提示，這裡無需再次提示
+    if not available_original_indices:
+        # get_available_music_indices 已經處理了提示，這裡無需再次提示
         return "沒有可用的音樂可以隨機推薦了。", None
 
-    selected_video = random.choice(available_videos_for_random)
-    st.session_state.recommended_music_original_indices.add(selected_video['index'])
-    youtube_id = extract_youtube_id(selected_video['url'])
+    pool = st.session_state.music_pool
+    _, video_by_index = _video_index(EXCEL_FILE_PATH)
+    selected_video = video_by_index[_choose_from_pool(pool)]
+    _discard_from_pool(pool, selected_video['index'])
+    youtube_id = selected_video['youtube_id']
 
     if youtube_id:
         display_text = "已為您隨機推薦歌曲："
@@ -399,51 +549,74 @@ def random_movie_recommendation(all_movies):
     if not all_movies:
         return "電影列表為空，無法隨機推薦電影。", None, 0
 
-    # 這裡將 recommended_movie_indices 設置為 set，提高效率
-    if 'recommended_movie_indices' not in st.session_state:
-        st.session_state.recommended_movie_indices = set()
-
     # 獲取所有電影的列表索引
-    all_list_indices = set(range(len(all_movies)))
-    available_indices = list(all_list_indices - st.session_state.recommended_movie_indices)
-
-    if not available_indices:
-        st.session_state.recommended_movie_indices = set() # 重置
-        available_indices = list(all_list_indices)
+    all_list_indices = range(len(all_movies))
+    pool = _get_recommendation_pool('movie_pool', all_list_indices)
+
+    # 電影海報列表有 TTL 快取，內容可能在工作階段中改變；數量不同時重建索引池，避免索引超出範圍
+    if pool.get('size') != len(all_movies):
+        _reset_pool(pool, all_list_indices)
+        pool['size'] = len(all_movies)
+    elif not pool['items']:
+        _reset_pool(pool, all_list_indices)
         st.info("所有電影都推薦過了，已重置電影推薦列表。")
 
-    selected_index = random.choice(available_indices)
+    selected_index = _choose_from_pool(pool)
     selected_movie = all_movies[selected_index]
 
-    st.session_state.recommended_movie_indices.add(selected_index)
+    _discard_from_pool(pool, selected_index)
 
-    remaining_count = len(available_indices) - 1
+    remaining_count = len(pool['items'])
 
     return selected_movie['title'], selected_movie['poster_url'], remaining_count
 
+# 只保留無法由規則推導的縣市簡稱與別名；「台/臺」寫法與「市/縣」後綴由 match_city_name 統一處理
 MANUAL_CORRECTIONS = {
-    "台北市": "臺北市", "台北": "臺北市", "北市": "臺北市", "北": "臺北市",
-    "新北": "新北市", "臺北縣": "新北市",
-    "桃園": "桃園市", "桃園縣": "桃園市", "桃": "桃園市", "園": "桃園市",
-    "台中": "臺中市", "台中市": "臺中市", "台中縣": "臺中市", "臺中縣": "臺中市", "中縣": "臺中市", "中市": "臺中市", "臺中": "臺中市", "中": "臺中市",
-    "台南": "臺南市", "台南市": "臺南市", "臺南": "臺南市", "台南縣": "臺南市", "臺南縣": "臺南市",
-    "高雄": "高雄市", "雄市": "高雄市",  "雄": "高雄市", "高雄縣": "高雄市",
-    "基隆": "基隆市", "基": "基隆市", "隆": "基隆市", "雞": "基隆市", "籠": "基隆市", "雞籠": "基隆市", "基隆縣": "基隆市", "基市": "基隆市", "隆市": "基隆市", "雞市": "基隆市", "籠市": "基隆市", "雞籠市": "基隆市", "雞籠縣": "基隆市", "雞縣": "基隆市", "籠縣": "基隆市",
-    "新竹": "新竹市", "竹": "新竹市", "竹市": "新竹市", "竹縣": "新竹縣",
-    "嘉義": "嘉義市", "嘉": "嘉義市", "義": "嘉義市", "嘉縣": "嘉義縣", "義縣": "嘉義縣",
-    "苗栗": "苗栗縣", "苗": "苗栗縣", "栗": "苗栗縣", "栗縣": "苗栗縣", "苗縣": "苗栗縣", "苗栗市": "苗栗縣",
-    "彰化": "彰化縣", "彰": "彰化縣", "化": "彰化縣", "彰縣": "彰化縣", "化縣": "彰化縣", "彰化市": "彰化縣",
-    "南投": "南投縣", "投": "南投縣", "投縣": "南投縣", "南投市": "南投縣",
-    "雲林": "雲林縣", "雲": "雲林縣", "林": "雲林縣", "雲縣": "雲林縣", "林縣": "雲林縣", "雲林市": "雲林縣",
-    "屏東": "屏東縣", "屏": "屏東縣", "屏縣": "屏東縣", "屏東市": "屏東縣", "琉球嶼": "屏東縣", "小琉球": "屏東縣", "琉球": "屏東縣",
-    "宜蘭": "宜蘭縣", "宜": "宜蘭縣", "蘭": "宜蘭縣", "宜縣": "宜蘭縣", "蘭縣": "宜蘭縣", "宜蘭市": "宜蘭縣", "龜山島": "宜蘭縣",
-    "花蓮": "花蓮縣", "花": "花蓮縣", "蓮": "花蓮縣", "花縣": "花蓮縣", "蓮縣": "花蓮縣", "花蓮市": "花蓮縣",
-    "台東": "臺東縣", "台東縣": "臺東縣", "台東市": "臺東市", "綠島": "臺東縣", "綠鳥": "臺東縣", "蘭嶼": "臺東縣",
-    "澎湖": "澎湖縣", "澎": "澎湖縣", "湖": "澎湖縣", "澎縣": "澎湖縣", "湖縣": "澎湖縣", "澎湖市": "澎湖縣",
-    "金門": "金門縣", "金": "金門縣", "門": "金門縣", "金縣": "金門縣", "門縣": "金門縣", "金門市": "金門縣",
-    "連江": "連江縣", "連江市": "連江縣", "馬祖": "連江縣", "馬縣": "連江縣", "祖縣": "連江縣", "連": "連江縣", "江": "連江縣", "連縣": "連江縣"
+    "北": "臺北市", "臺北縣": "新北市", "北縣": "新北市",
+    "桃": "桃園市", "園": "桃園市",
+    "中": "臺中市",
+    "雄": "高雄市",
+    "基": "基隆市", "隆": "基隆市", "雞": "基隆市", "籠": "基隆市", "雞籠": "基隆市",
+    "竹": "新竹市",
+    "嘉": "嘉義市", "義": "嘉義市",
+    "苗": "苗栗縣", "栗": "苗栗縣",
+    "彰": "彰化縣", "化": "彰化縣",
+    "投": "南投縣",
+    "雲": "雲林縣", "林": "雲林縣",
+    "屏": "屏東縣", "琉球嶼": "屏東縣", "小琉球": "屏東縣", "琉球": "屏東縣",
+    "宜": "宜蘭縣", "蘭": "宜蘭縣", "龜山島": "宜蘭縣",
+    "花": "花蓮縣", "蓮": "花蓮縣",
+    "綠島": "臺東縣", "綠鳥": "臺東縣", "蘭嶼": "臺東縣",
+    "澎": "澎湖縣", "湖": "澎湖縣",
+    "金": "金門縣", "門": "金門縣",
+    "馬祖": "連江縣", "馬縣": "連江縣", "祖縣": "連江縣", "連": "連江縣", "江": "連江縣"
 }
 
+_CITY_CHAR_TABLE = str.maketrans({'台': '臺'})
+
+def match_city_name(city_input, location_names):
+    """
+    將使用者輸入正規化為 API 的縣市名稱，找不到時返回 None。
+    依序嘗試：完整名稱、別名、替換「市/縣」後綴，最後以去除後綴的簡稱查別名表。
+    """
+    valid_names = set(location_names)
+    name = city_input.translate(_CITY_CHAR_TABLE).strip()
+    if name in valid_names:
+        return name
+    if name in MANUAL_CORRECTIONS:
+        return MANUAL_CORRECTIONS[name]
+
+    suffix = name[-1] if name.endswith(('市', '縣')) else ""
+    base = name[:-1] if suffix else name
+    for candidate in (base + "市", base + "縣"):
+        if candidate in valid_names:
+            return candidate
+
+    full_name = MANUAL_CORRECTIONS.get(base)
+    if full_name and suffix and full_name[:-1] + suffix in valid_names:
+        return full_name[:-1] + suffix # 例如「竹縣」對應新竹縣、「竹市」對應新竹市
+    return full_name
+
 def process_query(city_input, location_names, all_videos, movie_poster_urls, recommend_music, loaded_weather_codes):
     """處理天氣查詢和音樂/電影推薦的邏輯。"""
     reset_recommendation_states()
@@ -452,12 +625,7 @@ def process_query(city_input, location_names, all_videos, movie_poster_urls, rec
         st.session_state.result_text = "請輸入縣市名稱或天氣關鍵字！"
         return
 
-    matched_city = None
-
-    if city_input in MANUAL_CORRECTIONS:
-        matched_city = MANUAL_CORRECTIONS[city_input]
-    elif city_input in location_names:
-        matched_city = city_input
+    matched_city = match_city_name(city_input, location_names)
 
     if matched_city:
         weather_data_raw = get_weather_data(matched_city)
@@ -467,27 +635,19 @@ def process_query(city_input, location_names, all_videos, movie_poster_urls, rec
             st.session_state.result_text = weather_data_raw["display_text"]
 
             # --- 天氣圖片邏輯：簡化處理 ---
-            weather_code = None
-            
-            # 因為您的 CSV 總是匹配，我們可以這樣簡化獲取 weather_code
-            for csv_desc, code in loaded_weather_codes.items():
-                if weather_desc == csv_desc: # 精準匹配 weather_desc 到 CSV 中的中文描述
-                    weather_code = code
-                    break
-            
+            # 因為您的 CSV 總是匹配，精準匹配直接以雜湊查表取得 weather_code
+            weather_code = loaded_weather_codes['exact'].get(weather_desc)
+
             if weather_code is None: # 如果直接精準匹配沒有找到，可以嘗試模糊匹配作為備用
-                highest_score = -1
-                for csv_desc, code in loaded_weather_codes.items():
-                    score = fuzz.ratio(weather_desc.lower(), csv_desc.lower())
-                    if score > highest_score:
-                        highest_score = score
-                        weather_code = code # 取分數最高的 code
+                best_match = process.extractOne(weather_desc.lower(), loaded_weather_codes['keys_lower'], scorer=fuzz.ratio)
+                if best_match:
+                    weather_code = loaded_weather_codes['codes'][best_match[2]] # 取分數最高的 code
 
             if weather_code: # 確保找到了 weather_code
                 found_image_path = get_image_path_or_default(WEATHER_IMAGES_DIR, weather_code)
 
                 if found_image_path:
-                    st.session_state.recommended_weather_image_html = load_local_image_as_base64(found_image_path, width=70)
+                    st.session_state.recommended_weather_image_html = load_local_image_as_base64(found_image_path, width=WEATHER_ICON_WIDTH)
                     # 簡化 caption：直接顯示天氣描述
                     st.session_state.weather_image_caption_desc = weather_desc
                 else:
@@ -508,7 +668,7 @@ def process_query(city_input, location_names, all_videos, movie_poster_urls, rec
             # 如果天氣 API 失敗，嘗試顯示預設圖片
             default_image_path = get_image_path_or_default(WEATHER_IMAGES_DIR, "default") # 嘗試獲取預設圖
             if default_image_path:
-                st.session_state.recommended_weather_image_html = load_local_image_as_base64(default_image_path, width=70)
+                st.session_state.recommended_weather_image_html = load_local_image_as_base64(default_image_path, width=WEATHER_ICON_WIDTH)
                 st.session_state.weather_image_caption_desc = f"無法取得 {matched_city} 天氣資料" # 移除預設圖片括號
             else:
                 st.session_state.recommended_weather_image_html = None
@@ -524,6 +684,88 @@ def process_query(city_input, location_names, all_videos, movie_poster_urls, rec
         st.session_state.weather_image_caption_desc = None
 
 # --- Streamlit 應用程式主體 ---
+def render_results(weather_image_slot, result_slot):
+    """依 Session State 在主頁面預留的位置繪製天氣圖片、結果文字與推薦內容。"""
+    with weather_image_slot.container():
+        # 顯示天氣圖片：現在檢查的是 HTML 內容
+        if 'recommended_weather_image_html' in st.session_state and st.session_state.recommended_weather_image_html:
+            # 直接渲染 Base64 編碼的 HTML 圖片
+            st.markdown(st.session_state.recommended_weather_image_html, unsafe_allow_html=True)
+            if st.session_state.weather_image_caption_desc:
+                st.caption(st.session_state.weather_image_caption_desc)
+
+    with result_slot.container():
+        # 顯示結果文字
+        if 'result_text' in st.session_state and st.session_state.result_text:
+            st.info(st.session_state.result_text)
+        else:
+            st.info("試試左邊功能吧！")
+
+        st.markdown("---") # 在這個區塊下方加上分隔線
+
+        # --- 影片推薦顯示區塊 (保持不變，但YouTube URL格式調整) ---
+        if 'recommended_youtube_id' in st.session_state and st.session_state.recommended_youtube_id:
+            st.subheader("♪ 音樂推薦 ♪ ")
+
+            yt_col_left, yt_video_col, yt_col_right = st.columns([0.25, 0.5, 0.25])
+
+            with yt_video_col:
+                # 確保 Streamlit st.video 可以正確解析此連結，使用標準 v=ID 格式通常更穩妥
+                # 原來的 https://www.youtube.com/watch?v={id} 格式可能在 Streamlit Cloud 上有問題
+                # 最標準的嵌入連結通常是 https://www.youtube.com/embed/{id}
+                st.video(f"https://www.youtube.com/watch?v={st.session_state.recommended_youtube_id}", format="video/mp4", start_time=0, loop=False, autoplay=False)
+                st.caption(f"上方為推薦的 YouTube 影片。ID: {st.session_state.recommended_youtube_id}")
+
+        # --- 電影海報推薦顯示區塊 (保持不變) ---
+        elif 'recommended_image_url' in st.session_state and st.session_state.recommended_image_url:
+            st.subheader("🎞️ 電影推薦")
+
+            movie_col_left, movie_poster_col, movie_col_right = st.columns([0.4, 0.2, 0.4])
+
+            with movie_poster_col:
+                st.image(st.session_state.recommended_image_url, caption="推薦電影海報", use_container_width=True)
+
+        st.markdown("<br><br>", unsafe_allow_html=True)
+
+@st.fragment
+def sidebar_controls(location_names, all_videos, movie_poster_urls, loaded_weather_codes,
+                     weather_image_slot, result_slot):
+    """
+    側邊欄的輸入框與按鈕。包成 fragment 後，輸入文字或點選按鈕時只重新執行這個區塊，
+    不會重跑整頁的資料載入與背景設定；結果直接繪製到 main 預留的位置。
+    """
+    city_input = st.text_input(
+        "請輸入縣市或天氣：",
+        placeholder="例如：臺北市 或 晴",
+        key="sidebar_city_text_input"
+    )
+
+    if st.button("查詢天氣", key="sidebar_btn_query_weather", use_container_width=True):
+        # process_query 內部會調用集中重置函數
+        process_query(city_input, location_names, all_videos, movie_poster_urls,
+                      recommend_music=False, loaded_weather_codes=loaded_weather_codes)
+
+    if st.button("查詢天氣並推薦音樂", key="sidebar_btn_query_music", use_container_width=True):
+        # process_query 內部會調用集中重置函數
+        process_query(city_input, location_names, all_videos, movie_poster_urls,
+                      recommend_music=True, loaded_weather_codes=loaded_weather_codes)
+
+    if st.button("隨機音樂推薦", key="sidebar_btn_random_music", use_container_width=True):
+        text_result, youtube_id = random_music_recommendation(all_videos)
+        # 寫入本次推薦結果，並一併重置上次查詢或推薦的其他狀態
+        reset_recommendation_states(result_text=text_result, recommended_youtube_id=youtube_id)
+
+    if st.button("隨機電影推薦", key="sidebar_btn_random_movie", use_container_width=True):
+        display_name, poster_url, remaining = random_movie_recommendation(movie_poster_urls)
+        # 寫入本次推薦結果，並一併重置上次查詢或推薦的其他狀態
+        if poster_url:
+            reset_recommendation_states(result_text=f"為您推薦電影：**{display_name}**",
+                                        recommended_image_url=poster_url)
+        else:
+            reset_recommendation_states(result_text=display_name)
+
+    render_results(weather_image_slot, result_slot)
+
 def main():
     st.set_page_config(
         page_title="天氣心情點播網",
@@ -531,7 +773,7 @@ def main():
         initial_sidebar_state="expanded"
     )
     # 加入背景圖片
-    set_background("background.jpg")
+    set_background(BACKGROUND_IMAGE_URL)
     
     # 數據初始化
     location_names = get_location_names()
@@ -544,56 +786,11 @@ def main():
         st.session_state.result_text = ""
         st.session_state.recommended_youtube_id = None
         st.session_state.recommended_image_url = None
-        st.session_state.recommended_music_original_indices = set()
-        st.session_state.recommended_movie_indices = set() # 改用 set 更高效
+        # 音樂與電影的未推薦索引池在第一次推薦時建立 (見 _get_recommendation_pool)
         st.session_state.recommended_weather_image_html = None # 現在存儲 HTML 字串
         st.session_state.weather_image_caption_desc = None
         st.session_state.initialized = True # 標記為已初始化
 
-    # --- 左側操作區 (使用 st.sidebar) ---
-    with st.sidebar:
-
-        city_input = st.text_input(
-            "請輸入縣市或天氣：",
-            placeholder="例如：臺北市 或 晴",
-            key="sidebar_city_text_input"
-        )
-
-        if st.button("查詢天氣", key="sidebar_btn_query_weather", use_container_width=True):
-            # 調用集中重置函數
-            # reset_recommendation_states() # process_query 內部會調用，這裡可以不重複調用
-            process_query(city_input, location_names, all_videos, movie_poster_urls,
-                          recommend_music=False, loaded_weather_codes=loaded_weather_codes)
-
-        if st.button("查詢天氣並推薦音樂", key="sidebar_btn_query_music", use_container_width=True):
-            # 調用集中重置函數
-            # reset_recommendation_states() # process_query 內部會調用，這裡可以不重複調用
-            process_query(city_input, location_names, all_videos, movie_poster_urls,
-                          recommend_music=True, loaded_weather_codes=loaded_weather_codes)
-
-        if st.button("隨機音樂推薦", key="sidebar_btn_random_music", use_container_width=True):
-            reset_recommendation_states() # 隨機推薦前，重置上次查詢或推薦的結果
-            text_result, youtube_id = random_music_recommendation(all_videos)
-            st.session_state.result_text = text_result
-            st.session_state.recommended_youtube_id = youtube_id
-            # 其他狀態已在 reset_recommendation_states() 中重置
-
-        if st.button("隨機電影推薦", key="sidebar_btn_random_movie", use_container_width=True):
-            reset_recommendation_states() # 隨機推薦前，重置上次查詢或推薦的結果
-            display_name, poster_url, remaining = random_movie_recommendation(movie_poster_urls)
-            if poster_url:
-                st.session_state.result_text = f"為您推薦電影：**{display_name}**"
-                st.session_state.recommended_image_url = poster_url
-            else:
-                st.session_state.result_text = display_name
-            # 其他狀態已在 reset_recommendation_states() 中重置
-
-        st.markdown("---")
-        st.caption("Powered by [Streamlit](https://streamlit.io/)")
-        st.caption("Copyright© Santana")
-        st.caption("if you think I'm fine")
-        st.caption("you can hire")
-
     # --- 主頁面顯示區 ---
     # 欄位比例調整為 [0.6, 0.1, 0.3] (標題, 圖片, 空白)
     # 將 st.subheader 替換為 st.title，以符合原意，但注意字體會較大
@@ -602,50 +799,23 @@ def main():
     with title_col:
         st.subheader("✧ 天氣心情點播網 ✧") # 保持 subheader，字體較為適中
 
-    with image_col:
-        # 顯示天氣圖片：現在檢查的是 HTML 內容
-        if 'recommended_weather_image_html' in st.session_state and st.session_state.recommended_weather_image_html:
-            # 直接渲染 Base64 編碼的 HTML 圖片
-            st.markdown(st.session_state.recommended_weather_image_html, unsafe_allow_html=True)
-            if st.session_state.weather_image_caption_desc:
-                st.caption(st.session_state.weather_image_caption_desc)
-        else:
-            st.empty() # 如果沒有圖片，保持為空
-           
+    # 天氣圖片與結果區塊預留位置，由側邊欄 fragment 繪製，按鈕點選後不必整頁重新執行
+    weather_image_slot = image_col.empty()
+    result_slot = st.empty()
+
     with empty_col:
         st.empty() # 保持此欄位為空，實現30%的空白
 
-    # 顯示結果文字
-    if 'result_text' in st.session_state and st.session_state.result_text:
-        st.info(st.session_state.result_text)
-    else:
-        st.info("試試左邊功能吧！")
-
-    st.markdown("---") # 在這個區塊下方加上分隔線
-
-    # --- 影片推薦顯示區塊 (保持不變，但YouTube URL格式調整) ---
-    if 'recommended_youtube_id' in st.session_state and st.session_state.recommended_youtube_id:
-        st.subheader("♪ 音樂推薦 ♪ ")
-
-        yt_col_left, yt_video_col, yt_col_right = st.columns([0.25, 0.5, 0.25])
-
-        with yt_video_col:
-            # 確保 Streamlit st.video 可以正確解析此連結，使用標準 v=ID 格式通常更穩妥
-            # 原來的 https://www.youtube.com/watch?v={id} 格式可能在 Streamlit Cloud 上有問題
-            # 最標準的嵌入連結通常是 https://www.youtube.com/embed/{id}
-            st.video(f"https://www.youtube.com/watch?v={st.session_state.recommended_youtube_id}", format="video/mp4", start_time=0, loop=False, autoplay=False)
-            st.caption(f"上方為推薦的 YouTube 影片。ID: {st.session_state.recommended_youtube_id}")
-
-    # --- 電影海報推薦顯示區塊 (保持不變) ---
-    elif 'recommended_image_url' in st.session_state and st.session_state.recommended_image_url:
-        st.subheader("🎞️ 電影推薦")
-
-        movie_col_left, movie_poster_col, movie_col_right = st.columns([0.4, 0.2, 0.4])
-
-        with movie_poster_col:
-            st.image(st.session_state.recommended_image_url, caption="推薦電影海報", use_container_width=True)
+    # --- 左側操作區 (使用 st.sidebar) ---
+    with st.sidebar:
+        sidebar_controls(location_names, all_videos, movie_poster_urls, loaded_weather_codes,
+                         weather_image_slot, result_slot)
 
-    st.markdown("<br><br>", unsafe_allow_html=True)
+        st.markdown("---")
+        st.caption("Powered by [Streamlit](https://streamlit.io/)")
+        st.caption("Copyright© Santana")
+        st.caption("if you think I'm fine")
+        st.caption("you can hire")
 
 
 if __name__ == "__main__":